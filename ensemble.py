@@ -0,0 +1,184 @@
+# Oct 2026
+# A module for accumulating ensemble statistics of gait cycles over many trials and subjects
+
+import pandas as pd
+import numpy as np
+
+
+def ensemble_init(columns, limits, n_points=101, n_bins=200):
+
+    """Returns an empty accumulator for ensemble curves
+
+    Methods
+    ==========
+    The accumulator keeps the running count, mean and sum of squared deviations (Welford) of every column at every
+    percent of the gait cycle, together with a fixed-bin histogram used for the percentiles. Its size only depends on
+    the number of columns, n_points and n_bins, not on the number of trials added to it. The accumulator is a
+    dictionary of numpy arrays, so it can be pickled and sent between worker processes.
+
+    Parameters
+    ==========
+    columns : list
+        names of the columns to accumulate, e.g. ['hip_l_flex_ext', 'knee_l_flex_ext']
+    limits : tuple or dict
+        (low, high) range of the histogram, either one tuple for all columns or a dictionary of tuples per column.
+        Values outside of the range are counted in the first or last bin.
+    n_points : int
+        number of samples per gait cycle (same as in "gait_cycles" function)
+    n_bins : int
+        number of histogram bins per column and percent of the gait cycle
+
+    Returns
+    =======
+        A dictionary with the accumulator state
+    """
+
+    columns = list(columns)
+    if isinstance(limits, dict):
+        limits = [limits[col] for col in columns]
+    else:
+        limits = [limits] * len(columns)
+    limits = np.array(limits, dtype=float)
+
+    return dict({'columns': columns,
+                 'edges': np.linspace(limits[:, 0], limits[:, 1], n_bins + 1, axis=1),
+                 'count': 0,
+                 'mean': np.zeros((n_points, len(columns))),
+                 'm2': np.zeros((n_points, len(columns))),
+                 'min': np.full((n_points, len(columns)), np.inf),
+                 'max': np.full((n_points, len(columns)), -np.inf),
+                 'hist': np.zeros((n_points, len(columns), n_bins), dtype=np.int64)})
+
+
+def ensemble_update(state, cycles):
+
+    """Adds the gait cycles of one trial to the accumulator
+
+    Methods
+    ==========
+    The mean and sum of squared deviations of the new cycles are combined with the running values using the parallel
+    update of Chan et al. ("Updating formulae and a pairwise algorithm for computing sample variances", 1979). Cycles
+    with any missing value (e.g. the first frames of "force" and "moment") are skipped.
+
+    Parameters
+    ==========
+    state : dict
+        accumulator (output of "ensemble_init" function)
+    cycles : dataframe
+        time normalized gait cycles of one trial (output of "gait_cycles" function)
+
+    Returns
+    =======
+        The updated accumulator
+    """
+
+    n_points = state['mean'].shape[0]
+    values = cycles[state['columns']].to_numpy(dtype=float).reshape(-1, n_points, len(state['columns']))
+    values = values[~np.isnan(values).any(axis=(1, 2))]
+    if len(values) == 0:
+        return state
+
+    batch = dict({'count': len(values),
+                  'mean': values.mean(axis=0),
+                  'm2': ((values - values.mean(axis=0)) ** 2).sum(axis=0),
+                  'min': values.min(axis=0),
+                  'max': values.max(axis=0)})
+
+    # histogram bin of every value, counted with a single bincount over (percent, column, bin)
+    edges = state['edges']
+    n_bins = edges.shape[1] - 1
+    width = (edges[:, -1] - edges[:, 0]) / n_bins
+    bins = np.clip(np.floor((values - edges[:, 0]) / width).astype(int), 0, n_bins - 1)
+    flat = (np.arange(n_points)[:, None] * len(state['columns']) + np.arange(len(state['columns']))) * n_bins + bins
+    batch['hist'] = np.bincount(flat.ravel(), minlength=state['hist'].size).reshape(state['hist'].shape)
+
+    return _combine(state, batch)
+
+
+def ensemble_merge(state_a, state_b):
+
+    """Returns the accumulator of two partial accumulators, e.g. computed by separate worker processes
+
+    Parameters
+    ==========
+    state_a : dict
+        accumulator (output of "ensemble_init" or "ensemble_update" function)
+    state_b : dict
+        accumulator with the same columns, n_points and limits as state_a
+
+    Returns
+    =======
+        A new accumulator equal to adding the trials of both accumulators to a single one
+    """
+
+    if state_a['columns'] != state_b['columns'] or not np.array_equal(state_a['edges'], state_b['edges']):
+        raise ValueError('accumulators must have the same columns, n_points and limits')
+
+    return _combine(dict(state_a), state_b)
+
+
+def ensemble_summary(state, percentiles=(5, 50, 95)):
+
+    """Returns the ensemble curves of the accumulator
+
+    Methods
+    ==========
+    Mean and standard deviation (ddof = 1) are exact. Percentiles are estimated from the histogram by linear
+    interpolation inside the bin, so their resolution is (high - low) / n_bins.
+
+    Parameters
+    ==========
+    state : dict
+        accumulator (output of "ensemble_update" or "ensemble_merge" function)
+    percentiles : list
+        percentiles to report, between 0 and 100
+
+    Returns
+    =======
+        A dataframe indexed by percent of the gait cycle with a (column, statistic) multi-index for columns, where the
+        statistics are mean, std, min, max and p<percentile>
+    """
+
+    n_points, n_columns = state['mean'].shape
+    edges = state['edges']
+    cumulative = np.cumsum(state['hist'], axis=2)
+
+    stats = dict({'mean': state['mean'],
+                  'std': np.sqrt(state['m2'] / (state['count'] - 1)) if state['count'] > 1
+                  else np.full((n_points, n_columns), np.nan),
+                  'min': state['min'],
+                  'max': state['max']})
+
+    for p in percentiles:
+        # first bin in which the cumulative count reaches the rank, then linear interpolation inside that bin
+        rank = p / 100 * state['count']
+        upper = np.minimum((cumulative < rank).sum(axis=2), edges.shape[1] - 2)
+        below = np.where(upper > 0, np.take_along_axis(cumulative, np.maximum(upper - 1, 0)[..., None], 2)[..., 0], 0)
+        inside = np.take_along_axis(state['hist'], upper[..., None], 2)[..., 0]
+        fraction = np.clip((rank - below) / np.maximum(inside, 1), 0, 1)
+        low = edges[np.arange(n_columns), upper]
+        high = edges[np.arange(n_columns), upper + 1]
+        value = np.clip(low + fraction * (high - low), state['min'], state['max'])
+        stats['p{}'.format(p)] = value if state['count'] > 0 else np.full((n_points, n_columns), np.nan)
+
+    output = pd.concat({name: pd.DataFrame(value, columns=state['columns']) for name, value in stats.items()}, axis=1)
+    output = output.swaplevel(axis=1)[state['columns']]
+    output.index = np.linspace(0, 100, n_points)
+    output.index.name = 'percent'
+    return output
+
+
+def _combine(state, batch):
+
+    # Chan's parallel update of count, mean and m2; the arrays of state are replaced, not modified
+    count = state['count'] + batch['count']
+    if count == 0:
+        return state
+    delta = batch['mean'] - state['mean']
+    state['mean'] = state['mean'] + delta * batch['count'] / count
+    state['m2'] = state['m2'] + batch['m2'] + delta ** 2 * state['count'] * batch['count'] / count
+    state['min'] = np.minimum(state['min'], batch['min'])
+    state['max'] = np.maximum(state['max'], batch['max'])
+    state['hist'] = state['hist'] + batch['hist']
+    state['count'] = count
+    return state
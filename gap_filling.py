@@ -0,0 +1,148 @@
+# Oct 2026
+# A module for filling gaps of marker data
+
+import pandas as pd
+import numpy as np
+
+# (proximal, distal) markers of each rigid segment, used to keep segment length in filled frames
+SEGMENTS = [('hip_l', 'knee_l'), ('knee_l', 'ankle_l'), ('ankle_l', 'heel_l'), ('ankle_l', 'toe2_l'),
+            ('hip_r', 'knee_r'), ('knee_r', 'ankle_r'), ('ankle_r', 'heel_r'), ('ankle_r', 'toe2_r')]
+
+
+def find_gaps(data):
+
+    """Returns the gaps (runs of missing values) of every column of a dataframe
+
+    Methods
+    ==========
+    Run-length encoding of the missing values of all columns at once: a gap starts where a column goes from a value
+    to a missing value and stops where it goes back to a value.
+
+    Parameters
+    ==========
+    data : dataframe
+        e.g. marker data
+
+    Returns
+    =======
+    A dataframe with one row per gap and 4 columns:
+        column : name of the column
+        start : first missing frame
+        stop : first frame after the gap (exclusive)
+        length : number of missing frames
+    """
+
+    missing = np.isnan(data.to_numpy(dtype=float)).T
+    change = np.diff(np.pad(missing, ((0, 0), (1, 1))).astype(np.int8), axis=1)
+    column, start = np.nonzero(change == 1)
+    stop = np.nonzero(change == -1)[1]
+
+    return pd.DataFrame({'column': data.columns[column], 'start': start, 'stop': stop, 'length': stop - start})
+
+
+def fill_gaps(marker_data, max_gap=10, method='cubic', rigid=True):
+
+    """Returns marker data with gaps filled, and the list of gaps
+
+    Methods
+    ==========
+    Every gap of at most max_gap frames with a valid frame on both sides is filled, all gaps at once (no loop over
+    gaps). The frames are interpolated between the last frame before and the first frame after the gap, either
+    linearly or with a cubic Hermite spline whose slopes are the finite differences of the two frames on each side
+    (linear slope when the outer frame is missing too). With rigid=True, a filled marker is then moved along one of
+    its segments (SEGMENTS, e.g. knee_l to ankle_l) whose other marker is recorded in that frame, so that the segment
+    length is interpolated between the frames where both markers are recorded. A marker of several segments is
+    moved once, along the segment whose length changes the least between frames. A marker with some of its
+    coordinates recorded in a frame is not moved, so recorded values are never changed. Gaps which are longer or
+    touch the start or the end of the trial are left missing, and no frame is removed, so the frames stay aligned
+    with the force plate data.
+
+    Parameters
+    ==========
+    marker_data : dataframe
+        A dataframe with the 3d coordinates of markers, with missing values
+    max_gap : int
+        maximum number of missing frames to fill
+    method : str
+        'linear' or 'cubic'
+    rigid : bool
+        keep the length of the segments in the filled frames
+
+    Returns
+    =======
+        filled marker data (dataframe), and the gaps (output of "find_gaps" function) with a boolean column 'filled'
+    """
+
+    values = marker_data.to_numpy(dtype=float)
+    gaps = find_gaps(marker_data)
+    gaps['filled'] = (gaps['length'] <= max_gap) & (gaps['start'] > 0) & (gaps['stop'] < len(values))
+    fill = gaps[gaps['filled']]
+
+    # one entry per missing frame of the filled gaps
+    column = np.repeat(marker_data.columns.get_indexer(fill['column']), fill['length'])
+    before = np.repeat(fill['start'].to_numpy() - 1, fill['length'])
+    after = np.repeat(fill['stop'].to_numpy(), fill['length'])
+    offset = np.arange(len(column)) - np.repeat(np.cumsum(fill['length'].to_numpy()) - fill['length'].to_numpy(),
+                                                fill['length'])
+    frame = before + 1 + offset
+    span = after - before
+    t = (frame - before) / span
+
+    p0 = values[before, column]
+    p1 = values[after, column]
+    if method == 'linear':
+        output = p0 + t * (p1 - p0)
+    elif method == 'cubic':
+        slope = (p1 - p0) / span
+        m0 = values[np.maximum(before - 1, 0), column]
+        m0 = np.where((before > 0) & ~np.isnan(m0), p0 - m0, slope) * span
+        m1 = values[np.minimum(after + 1, len(values) - 1), column]
+        m1 = np.where((after < len(values) - 1) & ~np.isnan(m1), m1 - p1, slope) * span
+        output = (2 * t ** 3 - 3 * t ** 2 + 1) * p0 + (t ** 3 - 2 * t ** 2 + t) * m0 + \
+                 (- 2 * t ** 3 + 3 * t ** 2) * p1 + (t ** 3 - t ** 2) * m1
+    else:
+        raise ValueError("method must be 'linear' or 'cubic'")
+
+    filled = values.copy()
+    filled[frame, column] = output
+    if rigid:
+        was_missing = np.zeros(values.shape, dtype=bool)
+        was_missing[frame, column] = True
+        filled = _rigid(filled, was_missing, list(marker_data.columns))
+
+    return pd.DataFrame(filled, index=marker_data.index, columns=marker_data.columns), gaps
+
+
+def _rigid(values, was_missing, columns):
+
+    # move each filled marker along one segment, to the segment length interpolated between the recorded frames. A
+    # marker of several segments (e.g. ankle_l) uses the segment whose length changes the least between recorded
+    # frames among those with a recorded other marker, so it is only moved once. Only markers with all 3 coordinates
+    # filled are moved, so recorded values never change
+    recorded = ~was_missing & ~np.isnan(values)
+    frames = np.arange(len(values))
+    constraints = []
+    for proximal, distal in SEGMENTS:
+        names = [[marker + '_' + axis for axis in 'xyz'] for marker in (proximal, distal)]
+        if not all(col in columns for col in names[0] + names[1]):
+            continue
+        index = [[columns.index(col) for col in cols] for cols in names]
+        vector = values[:, index[1]] - values[:, index[0]]
+        norm = np.sqrt((vector ** 2).sum(axis=1))
+        measured = recorded[:, index[0]].all(axis=1) & recorded[:, index[1]].all(axis=1)
+        if measured.sum() < 2:
+            continue
+        length = np.interp(frames, frames[measured], norm[measured])
+        change = np.median(np.abs(np.diff(norm[measured])))
+        constraints.append((change, index, vector, norm, length))
+
+    moved = np.zeros(values.shape, dtype=bool)
+    for change, index, vector, norm, length in sorted(constraints, key=lambda constraint: constraint[0]):
+        scale = (length / np.where(norm > 0, norm, np.nan))[:, None]
+        # filled distal marker with a recorded proximal marker, and the opposite
+        for moving, fixed, sign in [(index[1], index[0], 1), (index[0], index[1], -1)]:
+            move = was_missing[:, moving].all(axis=1) & ~moved[:, moving].any(axis=1) & \
+                recorded[:, fixed].all(axis=1) & ~np.isnan(scale[:, 0])
+            values[np.ix_(move, moving)] = values[np.ix_(move, fixed)] + sign * (vector * scale)[move]
+            moved[np.ix_(move, moving)] = True
+    return values
@@ -0,0 +1,145 @@
+# Oct 2026
+# A module for updating joint angles, forces, moments and gait events while capture files are growing
+
+import io
+import os
+import pandas as pd
+import numpy as np
+import time_distance as td
+import realtime as rt
+
+
+def incremental_init(marker_file, fp_file, body_mass, gender, delta=0.01, constant=0.05):
+
+    """Returns an empty state for incremental processing of growing capture files
+
+    Parameters
+    ==========
+    marker_file : str
+        tab-separated marker data with a header line, e.g. data/marker_data.txt
+    fp_file : str
+        tab-separated force plate data with a header line, e.g. data/fp_data.txt
+    body_mass : float
+        total body mass in kg
+    gender: bool
+        0 : male
+        1 : female
+    delta: float
+        delta_t in s
+    constant : float
+        predifed percentage to detect heel strike and toe off (see "event_detection" function)
+
+    Returns
+    =======
+        A dictionary with the state
+    """
+
+    return dict({'files': [marker_file, fp_file], 'offset': [0, 0], 'header': [None, None],
+                 'pending': [None, None], 'stream': rt.stream_init(body_mass, gender, delta, constant),
+                 'angles': None, 'force': None, 'moment': None})
+
+
+def incremental_update(state):
+
+    """Reads the rows appended to the capture files since the last update and processes them
+
+    Methods
+    ==========
+    Each file is read from the byte offset where the previous update stopped, up to its last complete line, so the
+    cost of an update only depends on the number of new rows. Frames are processed once both files contain them
+    (rows of the file which is ahead wait for the next update), with "stream_update" which keeps the two previous
+    frames needed by the derivative and the state of the gait event detection. The results are copied at the end of
+    preallocated arrays whose capacity doubles when they are full, so the cached results grow in amortized constant
+    time per frame.
+
+    Parameters
+    ==========
+    state : dict
+        state (output of "incremental_init" function)
+
+    Returns
+    =======
+        A dictionary with 'angles', 'force' and 'moment' dataframes of the new frames, indexed by frame number, and
+        'events', a list of (event, index) tuples detected in the new frames
+    """
+
+    for k, file in enumerate(state['files']):
+        if os.path.getsize(file) < state['offset'][k]:
+            raise ValueError('{} is shorter than at the last update'.format(file))
+        with open(file, 'rb') as f:
+            f.seek(state['offset'][k])
+            data = f.read()
+        data = data[:data.rfind(b'\n') + 1]
+        state['offset'][k] += len(data)
+
+        if state['header'][k] is None:
+            if not data:
+                continue
+            header, data = data.split(b'\n', 1)
+            state['header'][k] = header.decode().rstrip('\r').split('\t')
+            state['pending'][k] = pd.DataFrame(columns=state['header'][k], dtype=float)
+        if data:
+            rows = pd.read_csv(io.BytesIO(data), sep='\t', header=None, names=state['header'][k])
+            state['pending'][k] = pd.concat([state['pending'][k], rows], ignore_index=True) \
+                if len(state['pending'][k]) else rows
+
+    if any(rows is None or len(rows) == 0 for rows in state['pending']):
+        return dict({'angles': None, 'force': None, 'moment': None, 'events': []})
+    n = min(len(rows) for rows in state['pending'])
+    marker_data, fp_data = [rows.iloc[:n] for rows in state['pending']]
+    state['pending'] = [rows.iloc[n:].reset_index(drop=True) for rows in state['pending']]
+
+    output = rt.stream_update(state['stream'], marker_data, fp_data)
+    for name in ['angles', 'force', 'moment']:
+        state[name] = _append(state[name], output[name])
+    return output
+
+
+def incremental_results(state):
+
+    """Returns all the results processed so far
+
+    Methods
+    ==========
+    The dataframes are read-only views of the cached arrays (no copy), so the cost of a call does not depend on the
+    number of frames processed; use the output of "incremental_update" function for the new frames only, and copy
+    the dataframes before modifying them.
+
+    Parameters
+    ==========
+    state : dict
+        state (output of "incremental_update" function)
+
+    Returns
+    =======
+        A dictionary with 'angles', 'force' and 'moment' dataframes indexed by frame number, and 'events', a
+        dataframe with the indices of heel strikes and toe offs (same as "event_detection" function)
+    """
+
+    output = dict({'events': td.events_table(state['stream']['events'])})
+    for name in ['angles', 'force', 'moment']:
+        cache = state[name]
+        if cache is None:
+            output[name] = None
+            continue
+        values = cache['values'][:cache['count']]
+        values.flags.writeable = False
+        output[name] = pd.DataFrame(values, index=pd.RangeIndex(cache['start'], cache['start'] + cache['count']),
+                                    columns=cache['columns'], copy=False)
+    return output
+
+
+def _append(cache, data):
+
+    # copy the rows of data at the end of the cached array, doubling its capacity when it is full
+    if cache is None:
+        cache = dict({'values': np.empty((max(len(data), 1024), data.shape[1])), 'count': 0,
+                      'columns': list(data.columns), 'start': int(data.index[0]) if len(data) else 0})
+    count = cache['count'] + len(data)
+    if count > len(cache['values']):
+        values = np.empty((max(count, 2 * len(cache['values'])), cache['values'].shape[1]))
+        values[:cache['count']] = cache['values'][:cache['count']]
+        cache['values'] = values
+    cache['values'][cache['count']:count] = data.to_numpy(dtype=float)
+    cache['count'] = count
+    return cache
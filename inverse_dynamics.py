@@ -3,6 +3,7 @@
 # A module for performing inverse kinetics on marker and force plate data
 
 import pandas as pd
+import numpy as np
 
 
 def mass(body_mass, gender):
@@ -66,49 +67,10 @@ def center_of_mass(marker_data, gender):
     Returns
     =======
         A dataframe with 18 columns including 3d coordinates of 6 body segment center of mass
-    """ 
-    
-    if gender == 0:
-        c1 = 40.95
-        c2 = 44.59
-        c3 = 44.15
-    if gender == 1:
-        c1 = 36.9
-        c2 = 27.1
-        c3 = 29.9
-
-    output = []
-    output.append(marker_data['hip_l_x'] - c1 * 0.01 * (marker_data['hip_l_x'] - marker_data['knee_l_x']))
-    output.append(marker_data['hip_l_y'] - c1 * 0.01 * (marker_data['hip_l_y'] - marker_data['knee_l_y']))
-    output.append(marker_data['hip_l_z'] - c1 * 0.01 * (marker_data['hip_l_z'] - marker_data['knee_l_z']))
-
-    output.append(marker_data['knee_l_x'] - c2 * 0.01 * (marker_data['knee_l_x'] - marker_data['ankle_l_x']))
-    output.append(marker_data['knee_l_y'] - c2 * 0.01 * (marker_data['knee_l_y'] - marker_data['ankle_l_y']))
-    output.append(marker_data['knee_l_z'] - c2 * 0.01 * (marker_data['knee_l_z'] - marker_data['ankle_l_z']))
-
-    output.append(marker_data['ankle_l_x'] - c3 * 0.01 * (marker_data['ankle_l_x'] - marker_data['toe2_l_x']))
-    output.append(marker_data['ankle_l_y'] - c3 * 0.01 * (marker_data['ankle_l_y'] - marker_data['toe2_l_y']))
-    output.append(marker_data['ankle_l_z'] - c3 * 0.01 * (marker_data['ankle_l_z'] - marker_data['toe2_l_z']))
-
-    output.append(marker_data['hip_r_x'] - c1 * 0.01 * (marker_data['hip_r_x'] - marker_data['knee_r_x']))
-    output.append(marker_data['hip_r_y'] - c1 * 0.01 * (marker_data['hip_r_y'] - marker_data['knee_r_y']))
-    output.append(marker_data['hip_r_z'] - c1 * 0.01 * (marker_data['hip_r_z'] - marker_data['knee_r_z']))
-
-    output.append(marker_data['knee_r_x'] - c2 * 0.01 * (marker_data['knee_r_x'] - marker_data['ankle_r_x']))
-    output.append(marker_data['knee_r_y'] - c2 * 0.01 * (marker_data['knee_r_y'] - marker_data['ankle_r_y']))
-    output.append(marker_data['knee_r_z'] - c2 * 0.01 * (marker_data['knee_r_z'] - marker_data['ankle_r_z']))
-
-    output.append(marker_data['ankle_l_x'] - c3 * 0.01 * (marker_data['ankle_l_x'] - marker_data['toe2_l_x']))
-    output.append(marker_data['ankle_r_y'] - c3 * 0.01 * (marker_data['ankle_r_y'] - marker_data['toe2_r_y']))
-    output.append(marker_data['ankle_r_z'] - c3 * 0.01 * (marker_data['ankle_r_z'] - marker_data['toe2_r_z']))
+    """
 
-    output = [list(i) for i in zip(*output)]
-    return pd.DataFrame(output, columns=['thigh_l_x', 'thigh_l_y', 'thigh_l_z',
-                                         'shank_l_x', 'shank_l_y', 'shank_l_z',
-                                         'foot_l_x', 'foot_l_y', 'foot_l_z',
-                                         'thigh_r_x', 'thigh_r_y', 'thigh_r_z',
-                                         'shank_r_x', 'shank_r_y', 'shank_r_z',
-                                         'foot_r_x', 'foot_r_y', 'foot_r_z'])
+    output = _center_of_mass(marker_data, gender)
+    return pd.DataFrame([list(i) for i in zip(*output.values())], columns=list(output))
 
 
 def derivative(df, delta=0.01, order=2):
@@ -185,42 +147,9 @@ def force(fp, mass, cm_dd):
         hip_r_z : z component of force applied on the right hip
 
     """
-        
-    g_x, g_y, g_z = [0, -9.81, 0]
-    cm_dd = cm_dd.dropna()
-
-    output = []
-    output.append(- fp['for_l_x'] - mass['foot_l'] * g_x + mass['foot_l'] * cm_dd['foot_l_x'])
-    output.append(- fp['for_l_y'] - mass['foot_l'] * g_y + mass['foot_l'] * cm_dd['foot_l_y'])
-    output.append(- fp['for_l_z'] - mass['foot_l'] * g_z + mass['foot_l'] * cm_dd['foot_l_z'])
-
-    output.append(- output[0] - mass['shank_l'] * g_x + mass['shank_l'] * cm_dd['shank_l_x'])
-    output.append(- output[1] - mass['shank_l'] * g_y + mass['shank_l'] * cm_dd['shank_l_y'])
-    output.append(- output[2] - mass['shank_l'] * g_z + mass['shank_l'] * cm_dd['shank_l_z'])
 
-    output.append(- output[3] - mass['thigh_l'] * g_x + mass['thigh_l'] * cm_dd['thigh_l_x'])
-    output.append(- output[4] - mass['thigh_l'] * g_y + mass['thigh_l'] * cm_dd['thigh_l_y'])
-    output.append(- output[5] - mass['thigh_l'] * g_z + mass['thigh_l'] * cm_dd['thigh_l_z'])
-
-    output.append(- fp['for_r_x'] - mass['foot_r'] * g_x + mass['foot_r'] * cm_dd['foot_r_x'])
-    output.append(- fp['for_r_y'] - mass['foot_r'] * g_y + mass['foot_r'] * cm_dd['foot_r_y'])
-    output.append(- fp['for_r_z'] - mass['foot_r'] * g_z + mass['foot_r'] * cm_dd['foot_r_z'])
-
-    output.append(- output[9] - mass['shank_r'] * g_x + mass['shank_r'] * cm_dd['shank_r_x'])
-    output.append(- output[10] - mass['shank_r'] * g_x + mass['shank_r'] * cm_dd['shank_r_y'])
-    output.append(- output[11] - mass['shank_r'] * g_x + mass['shank_r'] * cm_dd['shank_r_z'])
-
-    output.append(- output[12] - mass['thigh_r'] * g_x + mass['thigh_r'] * cm_dd['thigh_r_x'])
-    output.append(- output[13] - mass['thigh_r'] * g_y + mass['thigh_r'] * cm_dd['thigh_r_y'])
-    output.append(- output[14] - mass['thigh_r'] * g_z + mass['thigh_r'] * cm_dd['thigh_r_z'])
-
-    output = [list(i) for i in zip(*output)]
-    return pd.DataFrame(output, columns=['ankle_l_x', 'ankle_l_y', 'ankle_l_z',
-                                         'knee_l_x', 'knee_l_y', 'knee_l_z',
-                                         'hip_l_x', 'hip_l_y', 'hip_l_z',
-                                         'ankle_r_x', 'ankle_r_y', 'ankle_r_z',
-                                         'knee_r_x', 'knee_r_y', 'knee_r_z',
-                                         'hip_r_x', 'hip_r_y', 'hip_r_z'])
+    output = _force(fp, mass, cm_dd.dropna())
+    return pd.DataFrame([list(i) for i in zip(*output.values())], columns=list(output))
 
 
 def moment(fp, marker, mass, cm, cm_dd, force):
@@ -272,9 +201,101 @@ def moment(fp, marker, mass, cm, cm_dd, force):
         hip_r_z : z component of moment applied on the right hip
 
     """
-        
+
+    output = _moment(fp, marker, mass, cm, cm_dd.dropna(), force)
+    return pd.DataFrame([list(i) for i in zip(*output.values())], columns=list(output))
+
+
+#to_do (power)
+
+
+def _center_of_mass(marker_data, gender):
+
+    # same as "center_of_mass", for a dataframe or a dictionary of numpy arrays (time on the last axis)
+    if gender == 0:
+        c1 = 40.95
+        c2 = 44.59
+        c3 = 44.15
+    if gender == 1:
+        c1 = 36.9
+        c2 = 27.1
+        c3 = 29.9
+
+    output = []
+    output.append(marker_data['hip_l_x'] - c1 * 0.01 * (marker_data['hip_l_x'] - marker_data['knee_l_x']))
+    output.append(marker_data['hip_l_y'] - c1 * 0.01 * (marker_data['hip_l_y'] - marker_data['knee_l_y']))
+    output.append(marker_data['hip_l_z'] - c1 * 0.01 * (marker_data['hip_l_z'] - marker_data['knee_l_z']))
+
+    output.append(marker_data['knee_l_x'] - c2 * 0.01 * (marker_data['knee_l_x'] - marker_data['ankle_l_x']))
+    output.append(marker_data['knee_l_y'] - c2 * 0.01 * (marker_data['knee_l_y'] - marker_data['ankle_l_y']))
+    output.append(marker_data['knee_l_z'] - c2 * 0.01 * (marker_data['knee_l_z'] - marker_data['ankle_l_z']))
+
+    output.append(marker_data['ankle_l_x'] - c3 * 0.01 * (marker_data['ankle_l_x'] - marker_data['toe2_l_x']))
+    output.append(marker_data['ankle_l_y'] - c3 * 0.01 * (marker_data['ankle_l_y'] - marker_data['toe2_l_y']))
+    output.append(marker_data['ankle_l_z'] - c3 * 0.01 * (marker_data['ankle_l_z'] - marker_data['toe2_l_z']))
+
+    output.append(marker_data['hip_r_x'] - c1 * 0.01 * (marker_data['hip_r_x'] - marker_data['knee_r_x']))
+    output.append(marker_data['hip_r_y'] - c1 * 0.01 * (marker_data['hip_r_y'] - marker_data['knee_r_y']))
+    output.append(marker_data['hip_r_z'] - c1 * 0.01 * (marker_data['hip_r_z'] - marker_data['knee_r_z']))
+
+    output.append(marker_data['knee_r_x'] - c2 * 0.01 * (marker_data['knee_r_x'] - marker_data['ankle_r_x']))
+    output.append(marker_data['knee_r_y'] - c2 * 0.01 * (marker_data['knee_r_y'] - marker_data['ankle_r_y']))
+    output.append(marker_data['knee_r_z'] - c2 * 0.01 * (marker_data['knee_r_z'] - marker_data['ankle_r_z']))
+
+    output.append(marker_data['ankle_l_x'] - c3 * 0.01 * (marker_data['ankle_l_x'] - marker_data['toe2_l_x']))
+    output.append(marker_data['ankle_r_y'] - c3 * 0.01 * (marker_data['ankle_r_y'] - marker_data['toe2_r_y']))
+    output.append(marker_data['ankle_r_z'] - c3 * 0.01 * (marker_data['ankle_r_z'] - marker_data['toe2_r_z']))
+
+    return dict(zip(['thigh_l_x', 'thigh_l_y', 'thigh_l_z',
+                     'shank_l_x', 'shank_l_y', 'shank_l_z',
+                     'foot_l_x', 'foot_l_y', 'foot_l_z',
+                     'thigh_r_x', 'thigh_r_y', 'thigh_r_z',
+                     'shank_r_x', 'shank_r_y', 'shank_r_z',
+                     'foot_r_x', 'foot_r_y', 'foot_r_z'], output))
+
+
+def _force(fp, mass, cm_dd):
+
+    # same as "force", for dataframes or dictionaries of numpy arrays (time on the last axis)
+    g_x, g_y, g_z = [0, -9.81, 0]
+
+    output = []
+    output.append(- fp['for_l_x'] - mass['foot_l'] * g_x + mass['foot_l'] * cm_dd['foot_l_x'])
+    output.append(- fp['for_l_y'] - mass['foot_l'] * g_y + mass['foot_l'] * cm_dd['foot_l_y'])
+    output.append(- fp['for_l_z'] - mass['foot_l'] * g_z + mass['foot_l'] * cm_dd['foot_l_z'])
+
+    output.append(- output[0] - mass['shank_l'] * g_x + mass['shank_l'] * cm_dd['shank_l_x'])
+    output.append(- output[1] - mass['shank_l'] * g_y + mass['shank_l'] * cm_dd['shank_l_y'])
+    output.append(- output[2] - mass['shank_l'] * g_z + mass['shank_l'] * cm_dd['shank_l_z'])
+
+    output.append(- output[3] - mass['thigh_l'] * g_x + mass['thigh_l'] * cm_dd['thigh_l_x'])
+    output.append(- output[4] - mass['thigh_l'] * g_y + mass['thigh_l'] * cm_dd['thigh_l_y'])
+    output.append(- output[5] - mass['thigh_l'] * g_z + mass['thigh_l'] * cm_dd['thigh_l_z'])
+
+    output.append(- fp['for_r_x'] - mass['foot_r'] * g_x + mass['foot_r'] * cm_dd['foot_r_x'])
+    output.append(- fp['for_r_y'] - mass['foot_r'] * g_y + mass['foot_r'] * cm_dd['foot_r_y'])
+    output.append(- fp['for_r_z'] - mass['foot_r'] * g_z + mass['foot_r'] * cm_dd['foot_r_z'])
+
+    output.append(- output[9] - mass['shank_r'] * g_x + mass['shank_r'] * cm_dd['shank_r_x'])
+    output.append(- output[10] - mass['shank_r'] * g_x + mass['shank_r'] * cm_dd['shank_r_y'])
+    output.append(- output[11] - mass['shank_r'] * g_x + mass['shank_r'] * cm_dd['shank_r_z'])
+
+    output.append(- output[12] - mass['thigh_r'] * g_x + mass['thigh_r'] * cm_dd['thigh_r_x'])
+    output.append(- output[13] - mass['thigh_r'] * g_y + mass['thigh_r'] * cm_dd['thigh_r_y'])
+    output.append(- output[14] - mass['thigh_r'] * g_z + mass['thigh_r'] * cm_dd['thigh_r_z'])
+
+    return dict(zip(['ankle_l_x', 'ankle_l_y', 'ankle_l_z',
+                     'knee_l_x', 'knee_l_y', 'knee_l_z',
+                     'hip_l_x', 'hip_l_y', 'hip_l_z',
+                     'ankle_r_x', 'ankle_r_y', 'ankle_r_z',
+                     'knee_r_x', 'knee_r_y', 'knee_r_z',
+                     'hip_r_x', 'hip_r_y', 'hip_r_z'], output))
+
+
+def _moment(fp, marker, mass, cm, cm_dd, force):
+
+    # same as "moment", for dataframes or dictionaries of numpy arrays (time on the last axis)
     g_x, g_y, g_z = [0, -9.81, 0]
-    cm_dd = cm_dd.dropna()
 
     output = []
     output.append(- fp['mom_l_x'] - (fp['cop_l_y'] - marker['ankle_l_y']) * fp['for_l_z'] - \
@@ -427,21 +448,29 @@ def moment(fp, marker, mass, cm, cm_dd, force):
 
     output.append(- output[14] + temp)
 
-    output = [list(i) for i in zip(*output)]
-    return pd.DataFrame(output, columns=['ankle_l_x', 'ankle_l_y', 'ankle_l_z',
-                                         'knee_l_x', 'knee_l_y', 'knee_l_z',
-                                         'hip_l_x', 'hip_l_y', 'hip_l_z',
-                                         'ankle_r_x', 'ankle_r_y', 'ankle_r_z',
-                                         'knee_r_x', 'knee_r_y', 'knee_r_z',
-                                         'hip_r_x', 'hip_r_y', 'hip_r_z'])
-
-
-#to_do (power)
-
-
+    return dict(zip(['ankle_l_x', 'ankle_l_y', 'ankle_l_z',
+                     'knee_l_x', 'knee_l_y', 'knee_l_z',
+                     'hip_l_x', 'hip_l_y', 'hip_l_z',
+                     'ankle_r_x', 'ankle_r_y', 'ankle_r_z',
+                     'knee_r_x', 'knee_r_y', 'knee_r_z',
+                     'hip_r_x', 'hip_r_y', 'hip_r_z'], output))
 
 
+def _derivative(df, delta=0.01, order=2):
 
+    # same as "derivative", for a dictionary of numpy arrays (time on the last axis)
+    output = dict()
+    for col, value in df.items():
+        diff_1 = value - _shift(value, 1)
+        if order == 1:
+            output[col] = (value - diff_1) / delta
+        if order == 2:
+            output[col] = (value - 2 * diff_1 + (value - _shift(value, 2))) / delta ** 2
+    return output
 
 
+def _shift(value, periods):
 
+    output = np.full_like(value, np.nan)
+    output[..., periods:] = value[..., :-periods]
+    return output
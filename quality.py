@@ -0,0 +1,114 @@
+# Oct 2026
+# A module for screening the quality of marker and force plate data before inverse dynamics
+
+import pandas as pd
+import numpy as np
+import inverse_kinematics as ik
+
+ERRORS = ['missing_marker', 'missing_force', 'length_drift', 'cop_jump', 'wrong_foot']
+
+
+def screen(marker_data, fp_data, body_mass, constant=0.05, cop_constant=0.2, length_tolerance=0.1,
+           max_cop_step=0.05, max_foot_distance=0.1, min_run=15, min_score=0.95):
+
+    """Returns per-frame quality masks and per-trial quality scores
+
+    Methods
+    ==========
+    Every mask is computed over all frames at once:
+        missing_marker : a marker coordinate is missing
+        missing_force : a force plate value is missing
+        length_drift : the length of a segment (see "length" function) differs from its median over the trial by more
+                       than length_tolerance (relative), e.g. when two markers are swapped
+        unloaded_l, unloaded_r : the vertical force of the plate is below the "event_detection" threshold
+                                 (constant * body_mass * 9.81), so its center of pressure is meaningless
+        cop_jump : the center of pressure moves more than max_cop_step between two frames in which the vertical force
+                   is above cop_constant * body_mass * 9.81 (the center of pressure is noisy at lower forces)
+        wrong_foot : the center of pressure of a plate loaded above cop_constant * body_mass * 9.81 is closer to the
+                     other foot than to its own foot along the x axis (mid point of heel and toe markers), and farther
+                     than max_foot_distance from its own foot, for at least min_run consecutive frames, e.g. when one
+                     foot lands on both plates (shorter runs happen when a plate starts to be loaded)
+    The score of a trial is the fraction of frames without any error (all masks except unloaded_l and unloaded_r).
+
+    Parameters
+    ==========
+    marker_data : dataframe
+        A dataframe with 3d coordinates of the markers
+    fp_data : dataframe
+        A dataframe with 18 columns including 3d coordinates of center of pressure and 3d components of the force and
+        moment applied to the left and right force plates
+    body_mass : float
+        body mass in kg
+    constant : float
+        predifed percentage to detect heel strike and toe off (see "event_detection" function)
+    cop_constant : float
+        percentage of body weight above which the center of pressure is checked
+    length_tolerance : float
+        maximum relative change of the segment lengths
+    max_cop_step : float
+        maximum displacement of the center of pressure between two frames in m
+    max_foot_distance : float
+        distance along the x axis between the center of pressure and its own foot above which it can be on the wrong
+        foot, in m
+    min_run : int
+        minimum number of consecutive frames of a wrong foot
+    min_score : float
+        minimum score of an accepted trial
+
+    Returns
+    =======
+        masks : A dataframe of booleans with one column per mask
+        scores : A series with the fraction of flagged frames of each mask, the 'score' of the trial and 'accept'
+                 (score >= min_score)
+    """
+
+    masks = dict()
+    markers = marker_data.to_numpy(dtype=float)
+    masks['missing_marker'] = np.isnan(markers).any(axis=1)
+    masks['missing_force'] = np.isnan(fp_data.to_numpy(dtype=float)).any(axis=1)
+
+    length = np.column_stack(list(ik._length(ik._segments(marker_data)).values()))
+    with np.errstate(invalid='ignore'):
+        drift = np.abs(length / np.nanmedian(length, axis=0) - 1)
+    masks['length_drift'] = (drift > length_tolerance).any(axis=1)
+
+    threshold = constant * body_mass * 9.81
+    foot = dict()
+    for side in ['l', 'r']:
+        foot[side] = 0.5 * (marker_data['heel_' + side + '_x'] + marker_data['toe2_' + side + '_x']).to_numpy()
+    cop_jump = np.zeros(len(fp_data), dtype=bool)
+    wrong_foot = np.zeros(len(fp_data), dtype=bool)
+    for side, other in [('l', 'r'), ('r', 'l')]:
+        masks['unloaded_' + side] = fp_data['for_' + side + '_y'].to_numpy() < threshold
+        loaded = fp_data['for_' + side + '_y'].to_numpy() >= cop_constant * body_mass * 9.81
+        cop = fp_data[['cop_' + side + '_x', 'cop_' + side + '_z']].to_numpy(dtype=float)
+
+        step = np.zeros(len(cop))
+        step[1:] = np.sqrt((np.diff(cop, axis=0) ** 2).sum(axis=1))
+        both = loaded & np.append(False, loaded[:-1])
+        cop_jump |= both & (step > max_cop_step)
+
+        own = np.abs(cop[:, 0] - foot[side])
+        opposite = np.abs(cop[:, 0] - foot[other])
+        wrong_foot |= _runs(loaded & (opposite < own) & (own > max_foot_distance), min_run)
+    masks['cop_jump'] = cop_jump
+    masks['wrong_foot'] = wrong_foot
+
+    masks = pd.DataFrame(masks, index=fp_data.index)
+    scores = masks.mean()
+    scores['score'] = 1 - masks[ERRORS].any(axis=1).mean()
+    scores['accept'] = scores['score'] >= min_score
+    return masks, scores
+
+
+def _runs(mask, min_run):
+
+    # keep the runs of at least min_run consecutive True values of a boolean array
+    change = np.diff(np.concatenate([[0], mask.astype(np.int8), [0]]))
+    start = np.flatnonzero(change == 1)
+    stop = np.flatnonzero(change == -1)
+    keep = stop - start >= min_run
+    output = np.zeros(len(mask) + 1, dtype=int)
+    np.add.at(output, start[keep], 1)
+    np.add.at(output, stop[keep], -1)
+    return np.cumsum(output[:-1]) > 0
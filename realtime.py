@@ -0,0 +1,461 @@
+# Oct 2026
+# A module for computing joint angles, forces and moments in real time from streamed marker and force plate frames
+
+import io
+import time
+import json
+import asyncio
+import logging
+import argparse
+from collections import deque
+import pandas as pd
+import numpy as np
+import inverse_kinematics as ik
+import inverse_dynamics as id
+import time_distance as td
+
+STAGES = ['queue', 'kinematics', 'events', 'dynamics', 'publish', 'end_to_end']
+
+logger = logging.getLogger(__name__)
+
+
+def stream_init(body_mass, gender, delta=0.01, constant=0.05):
+
+    """Returns an empty state for streaming inverse kinematics and inverse dynamics
+
+    Parameters
+    ==========
+    body_mass : float
+        total body mass in kg
+    gender: bool
+        0 : male
+        1 : female
+    delta: float
+        delta_t in s
+    constant : float
+        predifed percentage to detect heel strike and toe off (see "event_detection" function)
+
+    Returns
+    =======
+        A dictionary with the stream state
+    """
+
+    return dict({'mass': id.mass(body_mass, gender), 'gender': gender, 'delta': delta,
+                 'events': td.event_detection_init(body_mass, constant), 'history': None, 'start': 0})
+
+
+def stream_update(state, marker_data, fp_data, timing=None):
+
+    """Returns joint angles, forces, moments and gait events of new frames
+
+    Methods
+    ==========
+    Same formulas as segments, angles, center_of_mass, derivative, force and moment, evaluated on numpy arrays of the
+    new frames only, and "event_detection_update" for the gait events. The last two frames of the previous update
+    are kept as history for the derivative, so a trial streamed in chunks gives the same output as the whole trial.
+
+    Parameters
+    ==========
+    state : dict
+        stream state (output of "stream_init" function)
+    marker_data : dataframe
+        new frames of marker data
+    fp_data : dataframe
+        new frames of force plate data, same number of rows as marker_data
+    timing : dict, optional
+        filled with the duration in s of the 'kinematics', 'events' and 'dynamics' stages
+
+    Returns
+    =======
+        A dictionary with 'angles', 'force' and 'moment' dataframes indexed by frame number, and 'events', a list of
+        (event, index) tuples
+    """
+
+    clock = time.perf_counter()
+    marker = dict({col: marker_data[col].to_numpy(dtype=float) for col in marker_data.columns})
+    fp = dict({col: fp_data[col].to_numpy(dtype=float) for col in fp_data.columns})
+    n_history = 0
+    if state['history'] is not None:
+        marker = dict({col: np.concatenate([state['history'][0][col], value]) for col, value in marker.items()})
+        fp = dict({col: np.concatenate([state['history'][1][col], value]) for col, value in fp.items()})
+        n_history = len(next(iter(state['history'][0].values())))
+
+    angles = ik._angles(ik._segments(marker))
+    clock = _elapsed(timing, 'kinematics', clock)
+
+    events = td.event_detection_update(state['events'], fp_data)
+    clock = _elapsed(timing, 'events', clock)
+
+    cm = id._center_of_mass(marker, state['gender'])
+    cm_dd = id._derivative(cm, state['delta'], 2)
+    force = id._force(fp, state['mass'], cm_dd)
+    moment = id._moment(fp, marker, state['mass'], cm, cm_dd, force)
+
+    index = np.arange(state['start'], state['start'] + len(marker_data))
+    output = dict({'events': events})
+    for name, value in [('angles', angles), ('force', force), ('moment', moment)]:
+        output[name] = pd.DataFrame(dict({col: v[n_history:] for col, v in value.items()}), index=index)
+    _elapsed(timing, 'dynamics', clock)
+
+    state['history'] = (dict({col: value[-2:] for col, value in marker.items()}),
+                        dict({col: value[-2:] for col, value in fp.items()}))
+    state['start'] += len(marker_data)
+    return output
+
+
+async def start_server(body_mass, gender, host='127.0.0.1', ingest_port=9870, publish_port=9871, queue_size=256,
+                       subscriber_queue_size=256, max_batch=32, delta=0.01, constant=0.05, history=10000):
+
+    """Starts a server which computes joint angles, forces and moments of streamed frames
+
+    Methods
+    ==========
+    Publishers connect to ingest_port and send tab-separated lines: a header with the marker and force plate column
+    names (same names as in /data, plus an optional 'time' column with the capture time from time.time()), then one
+    line per frame, with empty fields for missing values. Each connection is processed by "stream_update" in batches
+    of the frames waiting in its queue (up to max_batch), so the server catches up after a delay instead of falling
+    behind one frame at a time. A batch which cannot be processed is logged and its connection is closed.
+    Subscribers connect to publish_port and receive one JSON line per frame with the frame number, capture time,
+    angles, force, moment and the gait events detected at that frame.
+    Backpressure: the ingest queue holds at most queue_size frames, when it is full the server stops reading from
+    the socket and the publisher is blocked by TCP flow control. A slow subscriber does not block the others, its
+    oldest messages are dropped when its queue holds subscriber_queue_size messages (counted in server['dropped']).
+    The duration of each stage of the last history frames is kept for "latency_report" function.
+
+    Parameters
+    ==========
+    body_mass : float
+        total body mass in kg
+    gender: bool
+        0 : male
+        1 : female
+    host : str
+        address of the server
+    ingest_port : int
+        port for publishers of marker and force plate frames
+    publish_port : int
+        port for subscribers of the results
+    queue_size : int
+        maximum number of frames waiting to be processed per publisher
+    subscriber_queue_size : int
+        maximum number of messages waiting to be sent per subscriber
+    max_batch : int
+        maximum number of frames processed at once
+    delta: float
+        delta_t in s
+    constant : float
+        predifed percentage to detect heel strike and toe off (see "event_detection" function)
+    history : int
+        number of frames kept for latency percentiles
+
+    Returns
+    =======
+        A dictionary with the server state, to be stopped with "stop_server" function
+    """
+
+    server = dict({'publishers': set(), 'subscribers': dict(), 'tasks': set(), 'frames': 0, 'dropped': 0,
+                   'latency': dict({stage: deque(maxlen=history) for stage in STAGES})})
+    parameters = dict({'body_mass': body_mass, 'gender': gender, 'delta': delta, 'constant': constant,
+                       'queue_size': queue_size, 'max_batch': max_batch})
+
+    server['ingest'] = await asyncio.start_server(lambda reader, writer: _ingest(server, parameters, reader, writer),
+                                                  host, ingest_port)
+    server['publish'] = await asyncio.start_server(
+        lambda reader, writer: _subscribe(server, subscriber_queue_size, reader, writer), host, publish_port)
+    return server
+
+
+async def stop_server(server, timeout=5.0):
+
+    """Stops a server started by "start_server" function
+
+    Methods
+    ==========
+    New connections are refused, then the server waits up to timeout for the publishers to finish sending and for
+    their frames to be processed, and up to timeout for the queued messages to be sent to subscribers. Publishers and
+    subscribers still connected after the timeout are disconnected, the incomplete last line of a publisher is
+    dropped.
+
+    Parameters
+    ==========
+    server : dict
+        server state (output of "start_server" function)
+    timeout : float
+        maximum time in s to wait for publishers, and then for subscribers
+
+    Returns
+    =======
+        None
+    """
+
+    for key in ['ingest', 'publish']:
+        server[key].close()
+
+    if server['tasks']:
+        pending = (await asyncio.wait(list(server['tasks']), timeout=timeout))[1]
+        if pending:
+            for writer in list(server['publishers']):
+                writer.close()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    subscribers = list(server['subscribers'].items())
+    for queue, (task, writer) in subscribers:
+        _put(server, queue, None)
+    if subscribers:
+        pending = (await asyncio.wait([task for queue, (task, writer) in subscribers], timeout=timeout))[1]
+        for queue, (task, writer) in subscribers:
+            if task in pending:
+                # a subscriber blocked in drain gets a ConnectionError
+                writer.transport.abort()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+def latency_report(server, percentiles=(50, 95, 99)):
+
+    """Returns latency percentiles of each stage of a server
+
+    Parameters
+    ==========
+    server : dict
+        server state (output of "start_server" function)
+    percentiles : list
+        percentiles to report, between 0 and 100
+
+    Returns
+    =======
+        A dataframe indexed by stage with the number of frames and the latency percentiles in ms:
+        queue : from the reception of a frame to the start of its processing
+        kinematics : segments and angles
+        events : gait event detection
+        dynamics : center_of_mass, derivative, force and moment
+        publish : serialization and queueing of the messages to subscribers
+        end_to_end : from the capture time sent by the publisher to the queueing of the message
+    """
+
+    output = []
+    for stage in STAGES:
+        value = np.array(server['latency'][stage]) * 1000
+        output.append([len(value)] + (np.percentile(value, percentiles).tolist() if len(value)
+                                      else [np.nan] * len(percentiles)))
+    return pd.DataFrame(output, index=STAGES, columns=['count'] + ['p{}'.format(p) for p in percentiles])
+
+
+async def replay(marker_file, fp_file, host='127.0.0.1', port=9870, rate=1.0, delta=0.01):
+
+    """Streams recorded marker and force plate data to a server, for load testing
+
+    Parameters
+    ==========
+    marker_file : str
+        tab-separated marker data, e.g. data/marker_data.txt
+    fp_file : str
+        tab-separated force plate data, e.g. data/fp_data.txt
+    host : str
+        address of the server
+    port : int
+        ingest port of the server
+    rate : float
+        speed relative to real time, e.g. 1 for real time, 10 for ten times faster, 0 for as fast as possible
+    delta: float
+        delta_t in s
+
+    Returns
+    =======
+        number of frames sent
+    """
+
+    data = pd.concat([pd.read_csv(marker_file, sep='\t'), pd.read_csv(fp_file, sep='\t')], axis=1)
+    lines = data.to_csv(sep='\t', header=False, index=False).splitlines()
+
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(('\t'.join(list(data.columns) + ['time']) + '\n').encode())
+    start = time.perf_counter()
+    for i, line in enumerate(lines):
+        if rate > 0:
+            wait = start + i * delta / rate - time.perf_counter()
+            if wait > 0.001:
+                await asyncio.sleep(wait)
+        writer.write('{}\t{!r}\n'.format(line, time.time()).encode())
+        await writer.drain()
+    writer.close()
+    await writer.wait_closed()
+    return len(lines)
+
+
+async def _ingest(server, parameters, reader, writer):
+
+    # one stream state and processing task per publisher
+    server['tasks'].add(asyncio.current_task())
+    server['publishers'].add(writer)
+    task = None
+    try:
+        header = await reader.readline()
+        if not header.endswith(b'\n'):
+            return
+        header = header.decode().rstrip('\r\n').split('\t')
+        state = stream_init(parameters['body_mass'], parameters['gender'], parameters['delta'],
+                            parameters['constant'])
+        queue = asyncio.Queue(maxsize=parameters['queue_size'])
+        task = asyncio.ensure_future(_process(server, state, header, queue, parameters['max_batch'], writer))
+        while True:
+            line = await reader.readline()
+            # a line without end of line is cut by the disconnection of the publisher
+            if not line.endswith(b'\n'):
+                break
+            await queue.put((time.perf_counter(), line))
+    except ConnectionError:
+        pass
+    finally:
+        try:
+            if task is not None:
+                # the processing task reads the queue until None, even after an error, so this only waits for the
+                # queued frames
+                await queue.put(None)
+                await task
+        finally:
+            if task is not None:
+                task.cancel()
+            server['tasks'].discard(asyncio.current_task())
+            server['publishers'].discard(writer)
+            writer.close()
+
+
+async def _process(server, state, header, queue, max_batch, writer):
+
+    fp_columns = [col for col in header if col.startswith(('cop_', 'for_', 'mom_'))]
+    marker_columns = [col for col in header if col not in fp_columns and col != 'time']
+
+    failed = False
+    while True:
+        batch = [await queue.get()]
+        while len(batch) < max_batch and not queue.empty():
+            batch.append(queue.get_nowait())
+        finished = batch[-1] is None
+        batch = [item for item in batch if item is not None]
+        if finished and len(batch) == 0:
+            return
+        if failed:
+            # the connection is closed, the frames still in the queue are discarded
+            continue
+
+        try:
+            _batch(server, state, header, marker_columns, fp_columns, batch)
+        except Exception:
+            logger.exception('frames %d to %d of a publisher could not be processed, closing the connection',
+                             state['start'], state['start'] + len(batch) - 1)
+            failed = True
+            writer.close()
+
+        if finished:
+            return
+
+
+def _batch(server, state, header, marker_columns, fp_columns, batch):
+
+    latency = server['latency']
+    clock = time.perf_counter()
+    latency['queue'].extend([clock - received for received, line in batch])
+    data = pd.read_csv(io.BytesIO(b''.join(line for received, line in batch)), sep='\t', header=None, names=header,
+                       index_col=False, dtype=float)
+    timing = dict()
+    output = stream_update(state, data[marker_columns], data[fp_columns], timing)
+    for stage, value in timing.items():
+        latency[stage].extend([value] * len(batch))
+
+    clock = time.perf_counter()
+    # a missing capture time is sent as null, NaN is not valid JSON
+    capture = [None if np.isnan(value) else float(value) for value in data['time']] if 'time' in data \
+        else [None] * len(batch)
+    events = dict()
+    for event, index in output['events']:
+        events.setdefault(index, []).append(event)
+    for k, frame in enumerate(output['angles'].index):
+        message = dict({'frame': int(frame), 'time': capture[k], 'events': events.get(frame, [])})
+        for name in ['angles', 'force', 'moment']:
+            message[name] = _record(output[name].columns, output[name].iloc[k].to_numpy())
+        for queue_out in list(server['subscribers']):
+            _put(server, queue_out, (json.dumps(message) + '\n').encode())
+    latency['publish'].extend([time.perf_counter() - clock] * len(batch))
+    if 'time' in data:
+        latency['end_to_end'].extend(time.time() - data['time'].dropna().to_numpy())
+    server['frames'] += len(batch)
+
+
+async def _subscribe(server, size, reader, writer):
+
+    queue = asyncio.Queue(maxsize=size)
+    server['subscribers'][queue] = (asyncio.current_task(), writer)
+    try:
+        while True:
+            message = await queue.get()
+            if message is None:
+                break
+            writer.write(message)
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        server['subscribers'].pop(queue, None)
+        writer.close()
+
+
+def _put(server, queue, message):
+
+    # drop the oldest message of a full subscriber queue instead of blocking the processing
+    if queue.full():
+        queue.get_nowait()
+        server['dropped'] += 1
+    queue.put_nowait(message)
+
+
+def _record(columns, values):
+
+    return dict({col: None if np.isnan(value) else float(value) for col, value in zip(columns, values)})
+
+
+def _elapsed(timing, stage, clock):
+
+    now = time.perf_counter()
+    if timing is not None:
+        timing[stage] = now - clock
+    return now
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description='Real-time joint angles, forces and moments')
+    commands = parser.add_subparsers(dest='command')
+    serve = commands.add_parser('serve', help='run the server')
+    serve.add_argument('--body-mass', type=float, required=True)
+    serve.add_argument('--gender', type=int, choices=[0, 1], required=True)
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--ingest-port', type=int, default=9870)
+    serve.add_argument('--publish-port', type=int, default=9871)
+    serve.add_argument('--report', type=float, default=5, help='seconds between latency reports')
+    publish = commands.add_parser('replay', help='stream recorded data to the server')
+    publish.add_argument('--marker-file', default='data/marker_data.txt')
+    publish.add_argument('--fp-file', default='data/fp_data.txt')
+    publish.add_argument('--host', default='127.0.0.1')
+    publish.add_argument('--port', type=int, default=9870)
+    publish.add_argument('--rate', type=float, default=1.0, help='speed relative to real time, 0 for maximum')
+    args = parser.parse_args(argv)
+
+    async def run_server():
+        server = await start_server(args.body_mass, args.gender, args.host, args.ingest_port, args.publish_port)
+        while True:
+            await asyncio.sleep(args.report)
+            print('{} frames, {} dropped messages'.format(server['frames'], server['dropped']))
+            print(latency_report(server).round(3))
+
+    if args.command == 'serve':
+        asyncio.run(run_server())
+    elif args.command == 'replay':
+        start = time.perf_counter()
+        n = asyncio.run(replay(args.marker_file, args.fp_file, args.host, args.port, args.rate))
+        print('{} frames sent in {:.2f} s'.format(n, time.perf_counter() - start))
+    else:
+        parser.print_help()
+
+
+if __name__ == '__main__':
+    main()
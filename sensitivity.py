@@ -0,0 +1,169 @@
+# Oct 2026
+# A module for anthropometric sensitivity analysis of joint forces and moments
+
+import pandas as pd
+import numpy as np
+import inverse_dynamics as id
+
+SEGMENTS = ['thigh_l', 'shank_l', 'foot_l', 'thigh_r', 'shank_r', 'foot_r']
+JOINTS = ['ankle_l', 'knee_l', 'hip_l', 'ankle_r', 'knee_r', 'hip_r']
+
+
+def mass_sets(body_mass, gender=0, fractions=None):
+
+    """Returns a table of segment masses, one row per parameter set
+
+    Methods
+    ==========
+    Segment masses are computed with the "mass" function of inverse_dynamics for every (body_mass, gender) pair, or
+    with custom segment-mass fractions when they are given. body_mass, gender and fractions are broadcast against
+    each other. The gender of each set is kept, as it also sets the location of segment center of mass in
+    "sweep" function.
+
+    Parameters
+    ==========
+    body_mass : float or array
+        total body mass in kg
+    gender : bool or array
+        0 : male
+        1 : female
+        (with fractions, only used for the location of segment center of mass)
+    fractions : array, optional
+        (n, 3) array of thigh, shank and foot mass in percent of total body mass, used instead of gender coefficients
+
+    Returns
+    =======
+        A dataframe with 7 columns including mass of each body segment in kg and gender
+    """
+
+    if fractions is None:
+        # segment masses in percent of body mass for each gender coefficient set
+        percent = np.array([[id.mass(100, g)[seg] for seg in SEGMENTS[:3]] for g in [0, 1]])
+        body_mass, gender = np.broadcast_arrays(np.asarray(body_mass, dtype=float), np.asarray(gender, dtype=int))
+        gender = gender.ravel()
+        fractions = percent[gender]
+        body_mass = body_mass.ravel()
+    else:
+        fractions = np.atleast_2d(np.asarray(fractions, dtype=float))
+        body_mass, gender, _ = np.broadcast_arrays(np.asarray(body_mass, dtype=float).reshape(-1, 1),
+                                                   np.asarray(gender, dtype=int).reshape(-1, 1), fractions[:, :1])
+        body_mass = body_mass.ravel()
+        gender = gender.ravel()
+        fractions = np.broadcast_to(fractions, (len(body_mass), 3))
+
+    output = fractions * 0.01 * body_mass[:, None]
+    output = pd.DataFrame(np.hstack([output, output]), columns=SEGMENTS)
+    output['gender'] = gender
+    return output
+
+
+def sweep_basis(marker_data, fp_data, gender=(0, 1), delta=0.01):
+
+    """Returns the marker-dependent terms of joint forces and moments, computed once for a sweep
+
+    Methods
+    ==========
+    The "force" and "moment" functions of inverse_dynamics are affine in the segment masses:
+    force(m) = force(0) + sum_k m_k * (force(e_k) - force(0)), and the same for moment, where e_k is a unit mass on
+    segment k. center_of_mass and derivative are computed once, then force and moment are evaluated for zero mass and
+    for a unit mass on each of the 6 segments. The result of any set of segment masses is then an exact linear
+    combination of these 7 evaluations (see "sweep" function). The location of segment center of mass depends on
+    gender, so the evaluations are repeated for each gender.
+
+    Parameters
+    ==========
+    marker_data : dataframe
+        A dataframe with 27 columns including 3d coordinates of 9 joints
+    fp_data : dataframe
+        A dataframe with 18 columns including 3d coordinates of center of pressure and 3d components of the force and
+        moment applied to the left and right force plates
+    gender: bool or list
+        0 : male
+        1 : female
+        genders of the parameter sets to sweep (sets the location of segment center of mass)
+    delta: float
+        delta_t in s
+
+    Returns
+    =======
+        A dictionary with the genders ('gender'), the constant terms ('force_0', 'moment_0', genders x frames x
+        joints x 3) and the mass coefficients ('force_m', 'moment_m', genders x segments x frames x joints x 3) of
+        force and moment
+    """
+
+    gender = list(np.atleast_1d(gender))
+    basis = dict({'gender': gender, 'force_0': [], 'moment_0': [], 'force_m': [], 'moment_m': []})
+    for g in gender:
+        cm = id.center_of_mass(marker_data, g)
+        cm_dd = id.derivative(cm, delta, 2)
+
+        output = []
+        for k in range(len(SEGMENTS) + 1):
+            mass = dict({seg: 0.0 for seg in SEGMENTS})
+            if k > 0:
+                mass[SEGMENTS[k - 1]] = 1.0
+            f = id.force(fp_data, mass, cm_dd)
+            m = id.moment(fp_data, marker_data, mass, cm, cm_dd, f)
+            output.append([f.to_numpy().reshape(len(f), len(JOINTS), 3),
+                           m.to_numpy().reshape(len(m), len(JOINTS), 3)])
+
+        force_0, moment_0 = output[0]
+        basis['force_0'].append(force_0)
+        basis['moment_0'].append(moment_0)
+        basis['force_m'].append(np.stack([f for f, m in output[1:]]) - force_0)
+        basis['moment_m'].append(np.stack([m for f, m in output[1:]]) - moment_0)
+
+    for name in ['force_0', 'moment_0', 'force_m', 'moment_m']:
+        basis[name] = np.stack(basis[name])
+    return basis
+
+
+def sweep(basis, masses, frames=None):
+
+    """Returns joint forces and moments for many sets of segment masses
+
+    Methods
+    ==========
+    force = force_0 + masses @ force_m, broadcast over the parameter sets of each gender (see "sweep_basis"
+    function). The output has n_sets x n_frames x 6 x 3 values, e.g. 1000 sets of a 6000 frames trial take 860 MB
+    per output; use frames to restrict the sweep to a window of the trial.
+
+    Parameters
+    ==========
+    basis : dict
+        output of "sweep_basis" function
+    masses : dataframe
+        A dataframe with 6 columns including mass of each body segment in kg and a gender column, one row per
+        parameter set (output of "mass_sets" function). Without a gender column, the basis must have one gender.
+    frames : slice, optional
+        frames of the trial to compute
+
+    Returns
+    =======
+        force, moment : arrays of shape (parameter sets, frames, joints, 3), where joints are ankle_l, knee_l, hip_l,
+        ankle_r, knee_r, hip_r and the last axis is x, y, z
+    """
+
+    masses = pd.DataFrame(masses)
+    if 'gender' in masses:
+        gender = masses['gender'].to_numpy(dtype=int)
+    elif len(basis['gender']) == 1:
+        gender = np.full(len(masses), basis['gender'][0], dtype=int)
+    else:
+        raise ValueError('masses must have a gender column when the basis has several genders')
+    missing = set(gender.tolist()) - set(int(g) for g in basis['gender'])
+    if missing:
+        raise ValueError('the basis was not computed for gender {}'.format(sorted(missing)))
+    values = np.asarray(masses[SEGMENTS], dtype=float)
+    frames = slice(None) if frames is None else frames
+
+    n_frames = basis['force_0'][0][frames].shape[0]
+    force = np.empty((len(values), n_frames, len(JOINTS), 3))
+    moment = np.empty((len(values), n_frames, len(JOINTS), 3))
+    for k, g in enumerate(basis['gender']):
+        rows = gender == g
+        force[rows] = basis['force_0'][k][frames] + np.einsum('ps,sfjc->pfjc', values[rows],
+                                                              basis['force_m'][k][:, frames])
+        moment[rows] = basis['moment_0'][k][frames] + np.einsum('ps,sfjc->pfjc', values[rows],
+                                                                basis['moment_m'][k][:, frames])
+    return force, moment
@@ -0,0 +1,151 @@
+# Oct 2026
+# A module for storing and querying processed trials
+
+import os
+import json
+import pandas as pd
+import numpy as np
+import time_distance as td
+
+
+def store_append(path, subject, trial, outputs, events, **attributes):
+
+    """Adds the outputs of one trial to a results store
+
+    Methods
+    ==========
+    Each output is written once as a column-major .npy file (one contiguous block per column), and one row per output
+    and one row per gait cycle are appended to the index files trials.csv and cycles.csv. Nothing already in the store
+    is rewritten, so the cost of an append only depends on the size of the trial.
+
+    Parameters
+    ==========
+    path : str
+        directory of the store, created if it does not exist
+    subject : str
+        subject identifier
+    trial : str
+        trial identifier, unique for the subject
+    outputs : dict
+        dataframes of the trial, e.g. {'angles': angles, 'force': force, 'moment': moment}
+    events : dataframe
+        A dataframe with the indices of heel strikes and toe offs (output of "event_detection" function)
+    attributes :
+        values used to select trials in queries, e.g. gender=1, body_mass=68
+
+    Returns
+    =======
+        None
+    """
+
+    folder = os.path.join(path, str(subject), str(trial))
+    if os.path.exists(folder):
+        raise ValueError('trial {} of subject {} is already in the store'.format(trial, subject))
+    os.makedirs(folder)
+
+    outputs = dict(outputs, events=events)
+    trials = []
+    for kind, data in outputs.items():
+        np.save(os.path.join(folder, kind + '.npy'), np.ascontiguousarray(data.to_numpy(dtype=float).T))
+        trials.append(dict({'subject': subject, 'trial': trial, 'kind': kind, 'frames': len(data),
+                            'columns': '|'.join(data.columns), 'attributes': json.dumps(attributes)}))
+
+    n_frames = max(len(data) for kind, data in outputs.items() if kind != 'events')
+    cycles = []
+    for side in ['l', 'r']:
+        # same cycles as "gait_cycles" function
+        start, stop = td._cycles(events, side, n_frames)
+        for cycle in range(len(start)):
+            cycles.append(dict({'subject': subject, 'trial': trial, 'side': side, 'cycle': cycle,
+                                'start': start[cycle], 'stop': stop[cycle]}))
+
+    _append_csv(os.path.join(path, 'trials.csv'), pd.DataFrame(trials))
+    _append_csv(os.path.join(path, 'cycles.csv'), pd.DataFrame(cycles, columns=['subject', 'trial', 'side', 'cycle',
+                                                                                   'start', 'stop']))
+
+
+def store_query(path, kind, columns, side, cycles=None, where=None, n_points=None):
+
+    """Returns the gait cycles of some columns of the stored trials
+
+    Methods
+    ==========
+    The index files select the trials and cycles, then every selected .npy file is memory-mapped and only the
+    requested columns and frames are read from disk.
+
+    Parameters
+    ==========
+    path : str
+        directory of the store
+    kind : str
+        name of the output, e.g. 'moment'
+    columns : list
+        columns of the output, e.g. ['knee_r_x', 'knee_r_y', 'knee_r_z']
+    side : str
+        'l' : cycles between left heel strikes
+        'r' : cycles between right heel strikes
+    cycles : tuple, optional
+        (first, last) cycle numbers of each trial, both included
+    where : dict, optional
+        attributes of the trials to select, a value or a list of values per attribute, e.g. {'gender': 1}
+    n_points : int, optional
+        when given, cycles are time normalized to n_points samples (see "gait_cycles" function)
+
+    Returns
+    =======
+        A dataframe with the requested columns and a (subject, trial, cycle, frame) multi-index, or a
+        (subject, trial, cycle, start, finish, percent) multi-index when n_points is given, as "gait_cycles" function
+        (start and finish frames of the cycle), so that it can be used by "symmetry" function
+    """
+
+    trials = pd.read_csv(os.path.join(path, 'trials.csv'), dtype={'subject': str, 'trial': str})
+    trials = trials[trials['kind'] == kind]
+    attributes = trials['attributes'].map(json.loads)
+    for attribute, value in (where or dict()).items():
+        value = value if isinstance(value, (list, tuple)) else [value]
+        trials = trials[attributes.map(lambda a: a.get(attribute) in value)]
+        attributes = attributes[trials.index]
+
+    index = pd.read_csv(os.path.join(path, 'cycles.csv'), dtype={'subject': str, 'trial': str})
+    index = index[index['side'] == side]
+    if cycles is not None:
+        index = index[(index['cycle'] >= cycles[0]) & (index['cycle'] <= cycles[1])]
+    index = index.merge(trials[['subject', 'trial', 'columns']], on=['subject', 'trial']).sort_values(
+        ['subject', 'trial', 'cycle'], kind='stable')
+
+    output = []
+    for (subject, trial, names), group in index.groupby(['subject', 'trial', 'columns'], sort=False):
+        names = names.split('|')
+        data = np.load(os.path.join(path, subject, trial, kind + '.npy'), mmap_mode='r')
+        rows = [names.index(col) for col in columns]
+        first, last = group['start'].min(), group['stop'].max()
+        values = pd.DataFrame(np.array(data[rows, first:last + 1]).T, columns=columns,
+                              index=np.arange(first, last + 1))
+
+        if n_points is None:
+            frames = [np.arange(start, stop) for start, stop in zip(group['start'], group['stop'])]
+            part = values.loc[np.concatenate(frames)]
+            part.index = pd.MultiIndex.from_arrays([[subject] * len(part), [trial] * len(part),
+                                                    np.repeat(group['cycle'].to_numpy(), [len(f) for f in frames]),
+                                                    part.index], names=['subject', 'trial', 'cycle', 'frame'])
+        else:
+            part = td._normalize(values.to_numpy(), group['start'].to_numpy() - first,
+                                 group['stop'].to_numpy() - first, n_points)
+            part = pd.DataFrame(part.reshape(-1, len(columns)), columns=columns)
+            part.index = pd.MultiIndex.from_arrays([[subject] * len(part), [trial] * len(part),
+                                                    np.repeat(group['cycle'].to_numpy(), n_points),
+                                                    np.repeat(group['start'].to_numpy(), n_points),
+                                                    np.repeat(group['stop'].to_numpy(), n_points),
+                                                    np.tile(np.linspace(0, 100, n_points), len(group))],
+                                                   names=['subject', 'trial', 'cycle', 'start', 'finish', 'percent'])
+        output.append(part)
+
+    if len(output) == 0:
+        names = ['subject', 'trial', 'cycle'] + (['frame'] if n_points is None else ['start', 'finish', 'percent'])
+        return pd.DataFrame(columns=columns, index=pd.MultiIndex.from_arrays([[]] * len(names), names=names))
+    return pd.concat(output)
+
+
+def _append_csv(file, df):
+
+    df.to_csv(file, mode='a', header=not os.path.exists(file), index=False)
@@ -0,0 +1,238 @@
+# Oct 2026
+# A module for aligning gait cycles with dynamic time warping and for left/right symmetry analysis
+
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import pandas as pd
+import numpy as np
+
+
+def dtw(a, b, band=10):
+
+    """Returns the dynamic time warping distance of many pairs of curves at once
+
+    Methods
+    ==========
+    Sakoe, H., and S. Chiba. "Dynamic programming algorithm optimization for spoken word recognition." IEEE
+    transactions on acoustics, speech, and signal processing 26.1 (1978): 43-49.
+    D(i, j) = |a(i) - b(j)| + min(D(i - 1, j - 1), D(i - 1, j), D(i, j - 1)), restricted to |i - j| <= band. The
+    cells of an anti-diagonal (i + j constant) only depend on the two previous anti-diagonals, so the dynamic
+    program loops over the n + m - 1 anti-diagonals and computes all the cells of a diagonal for all pairs at once.
+
+    Parameters
+    ==========
+    a : array
+        (pairs, n) curves, or (pairs, n, k) curves with k columns each (e.g. x, y and z of a moment)
+    b : array
+        (pairs, m) or (pairs, m, k) curves, with |n - m| <= band
+    band : int
+        maximum time shift in samples (Sakoe-Chiba band)
+
+    Returns
+    =======
+        An array with the distance of each pair (sum of the euclidean distances along the warping path)
+    """
+
+    a = np.asarray(a, dtype=float)
+    b = np.asarray(b, dtype=float)
+    if a.ndim == 2:
+        a, b = a[..., None], b[..., None]
+    n, m = a.shape[1], b.shape[1]
+    if abs(n - m) > band:
+        raise ValueError('band must be at least the difference of the lengths of the curves')
+
+    # cost of the cells of diagonals d - 1 and d - 2, indexed by i
+    previous = np.full((len(a), n), np.inf)
+    before_previous = np.full((len(a), n), np.inf)
+    for d in range(n + m - 1):
+        i = np.arange(max(0, d - m + 1), min(n, d + 1))
+        i = i[np.abs(2 * i - d) <= band]
+        cost = np.sqrt(((a[:, i] - b[:, d - i]) ** 2).sum(axis=2))
+        current = np.full((len(a), n), np.inf)
+        if d == 0:
+            current[:, 0] = cost[:, 0]
+        else:
+            shifted = np.maximum(i - 1, 0)
+            best = np.minimum(np.minimum(np.where(i > 0, before_previous[:, shifted], np.inf),
+                                         np.where(i > 0, previous[:, shifted], np.inf)), previous[:, i])
+            current[:, i] = cost + best
+        before_previous, previous = previous, current
+
+    return previous[:, n - 1]
+
+
+def all_pairs_dtw(a, b, band=10, n_jobs=1, chunk_size=4096):
+
+    """Returns the dynamic time warping distance of every cycle of a to every cycle of b
+
+    Methods
+    ==========
+    The pairs are split in chunks of chunk_size pairs, each chunk is computed by "dtw" function, on n_jobs worker
+    processes when n_jobs > 1. The curves of a chunk are copied just before it is computed and at most 2 * n_jobs
+    chunks are submitted at once, so the memory does not grow with the number of pairs (except the distances).
+
+    Parameters
+    ==========
+    a : array
+        (cycles, n) or (cycles, n, k) curves, e.g. cycles of one session
+    b : array
+        (cycles, m) or (cycles, m, k) curves, e.g. cycles of another session
+    band : int
+        maximum time shift in samples (Sakoe-Chiba band)
+    n_jobs : int
+        number of worker processes
+    chunk_size : int
+        number of pairs computed at once
+
+    Returns
+    =======
+        An array (cycles of a, cycles of b) of distances
+    """
+
+    a = np.asarray(a, dtype=float)
+    b = np.asarray(b, dtype=float)
+    output = np.zeros(len(a) * len(b))
+    starts = range(0, len(output), chunk_size)
+
+    if n_jobs > 1:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            running = dict()
+            for start in starts:
+                running[executor.submit(_dtw_chunk, _chunk(a, b, start, chunk_size, band))] = start
+                if len(running) >= 2 * n_jobs:
+                    _collect(wait(running, return_when=FIRST_COMPLETED).done, running, output)
+            _collect(list(running), running, output)
+    else:
+        for start in starts:
+            value = _dtw_chunk(_chunk(a, b, start, chunk_size, band))
+            output[start:start + len(value)] = value
+    return output.reshape(len(a), len(b))
+
+
+def symmetry(left, right, columns, band=10):
+
+    """Returns left/right symmetry of gait cycles
+
+    Methods
+    ==========
+    Each left cycle is compared with the right cycle of the same trial whose heel strike falls inside it, so a cycle
+    missing on one side only removes one pair. Each column is compared with its right counterpart ('_l_' is replaced
+    by '_r_', e.g. hip_l_flex_ext and hip_r_flex_ext).
+        si : symmetry index, 100 * mean(|L - R|) / (0.5 * (range(L) + range(R))), 0 for a perfect symmetry
+        dtw : dynamic time warping distance of the two cycles (see "dtw" function) divided by the number of samples,
+              the difference of the curves after removing time shifts of at most band samples
+        dtw_si : symmetry index computed with the dtw distance instead of mean(|L - R|)
+    When both curves are constant, the indices are 0 if the curves are equal and missing otherwise.
+
+    Parameters
+    ==========
+    left : dataframe
+        time normalized left gait cycles (output of "gait_cycles" function with side 'l', or of "store_query"
+        function with side 'l' and n_points)
+    right : dataframe
+        time normalized right gait cycles (output of "gait_cycles" or "store_query" function with side 'r')
+    columns : list
+        left columns, e.g. ['hip_l_flex_ext', 'knee_l_flex_ext']
+    band : int
+        maximum time shift in samples
+
+    Returns
+    =======
+        A dataframe indexed by (cycle_l, cycle_r) pairs of cycle numbers, preceded by the other levels of the input
+        (e.g. subject and trial), with a (column, si / dtw / dtw_si) multi-index for columns
+    """
+
+    right_columns = [col.replace('_l_', '_r_') for col in columns]
+    n_points = left.index.get_level_values('percent').nunique()
+    # levels identifying the trial, e.g. subject and trial of "store_query" function
+    trial = [name for name in left.index.names if name not in ['cycle', 'start', 'finish', 'percent']]
+    bounds = dict()
+    for side, data in [('l', left), ('r', right)]:
+        cycles = data.index.droplevel('percent').unique().to_frame(index=False)
+        cycles['position'] = np.arange(len(cycles))
+        cycles['heel_strike'] = cycles['start']
+        bounds[side] = cycles.sort_values('start', kind='stable')
+
+    # first right heel strike of the same trial after each left heel strike, kept if it is inside the left cycle
+    pairs = pd.merge_asof(bounds['l'], bounds['r'], on='start', by=trial or None, direction='forward',
+                          suffixes=('_l', '_r'))
+    pairs = pairs[pairs['heel_strike_r'] < pairs['finish_l']].sort_values('position_l')
+    pair_l, pair_r = pairs['position_l'].to_numpy(), pairs['position_r'].to_numpy(dtype=int)
+
+    left = left[columns].to_numpy(dtype=float).reshape(-1, n_points, len(columns))[pair_l]
+    right = right[right_columns].to_numpy(dtype=float).reshape(-1, n_points, len(columns))[pair_r]
+
+    scale = 0.5 * (np.ptp(left, axis=1) + np.ptp(right, axis=1))
+    output = dict()
+    output['si'] = np.abs(left - right).mean(axis=1)
+    # one dtw per column, all pairs and columns at once
+    distance = dtw(np.moveaxis(left, 2, 1).reshape(-1, n_points), np.moveaxis(right, 2, 1).reshape(-1, n_points),
+                   band)
+    output['dtw'] = distance.reshape(len(pair_l), len(columns)) / n_points
+    output['dtw_si'] = output['dtw']
+    for name in ['si', 'dtw_si']:
+        output[name] = np.where(scale > 0, 100 * output[name] / np.where(scale > 0, scale, 1),
+                                np.where(output[name] == 0, 0, np.nan))
+
+    index = pd.MultiIndex.from_frame(pairs[trial + ['cycle_l', 'cycle_r']].astype({'cycle_r': int}))
+    output = pd.concat({name: pd.DataFrame(value, index=index, columns=columns) for name, value in output.items()},
+                       axis=1)
+    return output.swaplevel(axis=1)[columns]
+
+
+def benchmark(n_cycles=200, n_points=101, band=10, n_jobs=(1, 2, 4)):
+
+    """Returns the speed of "all_pairs_dtw" function in cycle pairs per second
+
+    Parameters
+    ==========
+    n_cycles : int
+        number of random cycles in each set, n_cycles ** 2 pairs are compared
+    n_points : int
+        number of samples per cycle
+    band : int
+        maximum time shift in samples
+    n_jobs : list
+        numbers of worker processes to test
+
+    Returns
+    =======
+        A dataframe indexed by n_jobs with the number of pairs, the time in s and the pairs per second
+    """
+
+    rng = np.random.default_rng(0)
+    a = np.cumsum(rng.normal(size=(n_cycles, n_points)), axis=1)
+    b = np.cumsum(rng.normal(size=(n_cycles, n_points)), axis=1)
+
+    output = []
+    for jobs in n_jobs:
+        start = time.perf_counter()
+        all_pairs_dtw(a, b, band, jobs)
+        elapsed = time.perf_counter() - start
+        output.append([n_cycles ** 2, elapsed, n_cycles ** 2 / elapsed])
+    return pd.DataFrame(output, index=pd.Index(n_jobs, name='n_jobs'), columns=['pairs', 'time', 'pairs_per_s'])
+
+
+def _chunk(a, b, start, chunk_size, band):
+
+    # curves of the pairs start to start + chunk_size, pairs are numbered row by row of the distance matrix
+    first, second = np.divmod(np.arange(start, min(start + chunk_size, len(a) * len(b))), len(b))
+    return a[first], b[second], band
+
+
+def _dtw_chunk(chunk):
+
+    return dtw(*chunk)
+
+
+def _collect(done, running, output):
+
+    # copy the distances of the finished chunks
+    for future in done:
+        start = running.pop(future)
+        value = future.result()
+        output[start:start + len(value)] = value
+
+
+if __name__ == '__main__':
+    print(benchmark())
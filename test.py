@@ -6,6 +6,7 @@ import inverse_kinematics as ik
 import time_distance as td
 import inverse_dynamics as id
 import plots 
+import quality as qa
 
 # reading data
 marker_data = pd.read_csv('...\marker_data.txt', sep='\t')
@@ -36,3 +37,9 @@ f = id.force(fp_data, m, cm_dd)
 plots.forces_plot(f, body_mass)
 m = id.moment(fp_data, marker_data, m, com, cm_dd, f)
 plots.moments_plot(f, body_mass, height)
+
+# quality module
+masks, scores = qa.screen(marker_data, fp_data, body_mass)
+print('Quality score is {0:.3f}'.format(scores['score']))
+# the sample trial is clean, it should pass the screen with a margin
+assert scores['score'] >= 0.97
@@ -3,6 +3,7 @@
 # A module for calculating gait events and time-distance features
 
 import pandas as pd
+import numpy as np
 
 
 def event_detection(fp_data, body_mass, constant = 0.05):
@@ -68,6 +69,203 @@ def event_detection(fp_data, body_mass, constant = 0.05):
     return pd.DataFrame(output, columns=['HSL', 'TOL', 'HSR', 'TOR'])
 
 
+def event_detection_init(body_mass, constant=0.05):
+
+    """Returns an empty state for streaming force plate event detection
+
+    Parameters
+    ==========
+    body_mass : float
+        body mass in kg
+    constant : float
+        predifed percentage to detect heel strike and toe off (see "event_detection" function)
+
+    Returns
+    =======
+        A dictionary with the detector state
+    """
+
+    return dict({'threshold': constant * body_mass * 9.81, 'above': [True, True], 'start': 0,
+                 'HSL': [], 'TOL': [], 'HSR': [], 'TOR': []})
+
+
+def event_detection_update(state, fp_data):
+
+    """Adds new frames of force plate data to a streaming event detector
+
+    Methods
+    ==========
+    Same threshold crossings as "event_detection" function, computed over all new frames at once: toe off is the first
+    frame below the threshold (or the first frame of the trial if it starts below it), heel strike is the first frame
+    above the threshold. Unlike "event_detection", a trial which finishes below the threshold does not get a heel
+    strike at its last frame.
+
+    Parameters
+    ==========
+    state : dict
+        detector state (output of "event_detection_init" function)
+    fp_data : dataframe
+        new frames of force plate data, following the frames of the previous update
+
+    Returns
+    =======
+        A list of (event, index) tuples detected in this update, e.g. [('TOL', 1520)]
+    """
+
+    new = []
+    for k, side in enumerate(['l', 'r']):
+        above = fp_data['for_' + side + '_y'].to_numpy() >= state['threshold']
+        if len(above) == 0:
+            continue
+        before = np.append(state['above'][k], above[:-1])
+        for event, frames in [('HS' + side.upper(), above & ~before), ('TO' + side.upper(), ~above & before)]:
+            index = (np.flatnonzero(frames) + state['start']).tolist()
+            state[event].extend(index)
+            new.extend([(event, i) for i in index])
+        state['above'][k] = above[-1]
+
+    state['start'] += len(fp_data)
+    return sorted(new, key=lambda event: event[1])
+
+
+def kinematic_event_detection(marker_data, window=20, direction=None):
+
+    """Returns the times at which heel strikes and toe offs happen based on the marker data, without force plates.
+
+    Methods
+    ==========
+    Zeni Jr, J. A., J. G. Richards, and J. S. Higginson. "Two simple methods for determining gait events during
+    treadmill and overground walking using kinematic data." Gait & posture 27.4 (2008): 710-714.
+    Heel strike happens when the heel marker is at its most anterior position relative to the pelvis (mid point of
+    the hip markers), toe off happens when the toe marker is at its most posterior position relative to the pelvis.
+    An extremum is a frame which is greater (or smaller) than every frame of the preceding and following window
+    frames, so events closer than window frames to the start or the end of the trial are not detected. The walking
+    direction along the z axis is taken from the heel to toe vector of both feet, so it works for both directions of
+    walking, unless it is given.
+
+    Parameters
+    ==========
+    marker_data : dataframe
+        A dataframe including the z coordinate of the hip, heel and toe markers of both legs
+    window : int
+        number of frames on each side of an extremum, shorter than half of a gait cycle
+    direction : int, optional
+        1 : walking toward +z
+        -1 : walking toward -z
+
+    Returns
+    =======
+        A dataframe with four columns (same as "event_detection" function):
+        HSL : All indices of left heel strike
+        TOL : All indices of left toe off
+        HSR : All indices of right heel strike
+        TOR : All indices of right toe off
+    """
+
+    state = kinematic_events_init(window, direction)
+    kinematic_events_update(state, marker_data)
+    return events_table(state)
+
+
+def kinematic_events_init(window=20, direction=None):
+
+    """Returns an empty state for streaming kinematic event detection
+
+    Parameters
+    ==========
+    window : int
+        number of frames on each side of an extremum (see "kinematic_event_detection" function)
+    direction : int, optional
+        walking direction along the z axis, 1 or -1 (see "kinematic_event_detection" function)
+
+    Returns
+    =======
+        A dictionary with the detector state
+    """
+
+    return dict({'window': window, 'direction': direction, 'buffer': np.empty((0, 4)), 'start': 0, 'next': window,
+                 'HSL': [], 'TOL': [], 'HSR': [], 'TOR': []})
+
+
+def kinematic_events_update(state, marker_data):
+
+    """Adds new frames of marker data to a streaming kinematic event detector
+
+    Methods
+    ==========
+    Same as "kinematic_event_detection" function. The last 2 * window frames are kept between updates, and an event
+    is reported as soon as the window frames that follow it are received, so the events of a trial streamed in chunks
+    are the same as the events of the whole trial. When the walking direction is not given, the frames are kept until
+    a frame with heel and toe markers of one foot gives it.
+
+    Parameters
+    ==========
+    state : dict
+        detector state (output of "kinematic_events_init" function)
+    marker_data : dataframe
+        new frames of marker data, following the frames of the previous update
+
+    Returns
+    =======
+        A list of (event, index) tuples detected in this update, e.g. [('HSL', 1520)]
+    """
+
+    if len(marker_data) == 0:
+        return []
+    if state['direction'] is None:
+        foot = np.concatenate([(marker_data['toe2_' + side + '_z'] - marker_data['heel_' + side + '_z']).to_numpy()
+                               for side in ['l', 'r']])
+        foot = foot[~np.isnan(foot)]
+        if len(foot) and np.sign(foot.mean()) != 0:
+            state['direction'] = int(np.sign(foot.mean()))
+
+    # position of the heel and toe relative to the pelvis, multiplied by the walking direction when it is known
+    pelvis = 0.5 * (marker_data['hip_l_z'] + marker_data['hip_r_z'])
+    signal = []
+    for side in ['l', 'r']:
+        signal.append(marker_data['heel_' + side + '_z'] - pelvis)
+        signal.append(marker_data['toe2_' + side + '_z'] - pelvis)
+    buffer = np.vstack([state['buffer'], np.column_stack(signal)])
+
+    window = state['window']
+    new = []
+    if len(buffer) > 2 * window and state['direction'] is not None:
+        # heel (maximum at heel strike) and toe (minimum at toe off) in the walking direction
+        signal = buffer * state['direction'] * np.array([1, -1, 1, -1])
+        # frames at which the preceding window frames are smaller and the following window frames are not greater
+        before = np.lib.stride_tricks.sliding_window_view(signal, window, axis=0).max(axis=2)
+        center = np.arange(max(state['next'] - state['start'], window), len(buffer) - window)
+        peak = (signal[center] > before[center - window]) & (signal[center] >= before[center + 1])
+        for k, event in enumerate(['HSL', 'TOL', 'HSR', 'TOR']):
+            index = (center[peak[:, k]] + state['start']).tolist()
+            state[event].extend(index)
+            new.extend([(event, i) for i in index])
+        state['next'] = state['start'] + len(buffer) - window
+        state['start'] += len(buffer) - 2 * window
+        buffer = buffer[-2 * window:]
+
+    state['buffer'] = buffer
+    return sorted(new, key=lambda event: event[1])
+
+
+def events_table(state):
+
+    """Returns the events of a streaming event detector
+
+    Parameters
+    ==========
+    state : dict
+        detector state (output of "event_detection_update" or "kinematic_events_update" function)
+
+    Returns
+    =======
+        A dataframe with four columns (same as "event_detection" function), padded with missing values when the
+        columns have different numbers of events
+    """
+
+    return pd.DataFrame({event: pd.Series(state[event], dtype='int64') for event in ['HSL', 'TOL', 'HSR', 'TOR']})
+
+
 def cadence(events, delta=0.01):
     
     """Returns number of steps per minute
@@ -132,3 +330,78 @@ def stance_ratio(events):
     return [ratio_l.mean(), ratio_r.mean()]
 
 
+def gait_cycles(data, events, side, n_points=101, max_ratio=1.5):
+
+    """Returns the gait cycles of a dataframe, each one time normalized to n_points samples
+
+    Methods
+    ==========
+    A gait cycle starts at a heel strike and finishes at the next heel strike of the same leg. Each cycle is resampled
+    to n_points equally spaced points (0 to 100 percent of the gait cycle) by linear interpolation. Strides which are
+    not a single gait cycle are discarded:
+        - cycles which finish after the last row of data, or at the last row (heel strike forced by "event_detection"
+          function when the trial ends in swing)
+        - cycles without exactly one toe off of the same leg, when events contains toe offs
+        - cycles longer than max_ratio times or shorter than 1 / max_ratio times the median cycle, e.g. two strides
+          when the foot missed the force plate
+    The remaining cycles are numbered from 0.
+
+    Parameters
+    ==========
+    data : dataframe
+        A dataframe indexed by frame, e.g. output of "angles", "force" or "moment" functions
+    events : dataframe
+        A dataframe with the indices of heel strikes and toe offs (output of "event_detection" function)
+    side : str
+        'l' : cycles between left heel strikes (HSL)
+        'r' : cycles between right heel strikes (HSR)
+    n_points : int
+        number of samples per gait cycle
+    max_ratio : float
+        maximum ratio of the length of a cycle to the median length
+
+    Returns
+    =======
+        A dataframe with the same columns as data and a (cycle, start, finish, percent) multi-index, start and finish
+        are the frames of the heel strikes which start and finish the cycle
+    """
+
+    start, finish = _cycles(events, side, len(data), max_ratio)
+    output = _normalize(data.to_numpy(dtype=float), start, finish, n_points)
+
+    percent = np.linspace(0, 100, n_points)
+    index = pd.MultiIndex.from_arrays([np.repeat(np.arange(len(start)), n_points), np.repeat(start, n_points),
+                                       np.repeat(finish, n_points), np.tile(percent, len(start))],
+                                      names=['cycle', 'start', 'finish', 'percent'])
+    return pd.DataFrame(output.reshape(-1, data.shape[1]), index=index, columns=data.columns)
+
+
+def _cycles(events, side, n_frames, max_ratio=1.5):
+
+    # start and finish frames of the valid gait cycles (see "gait_cycles" function)
+    heel_strike = events['HS' + side.upper()].dropna().astype(int).unique()
+    heel_strike = np.sort(heel_strike[heel_strike < n_frames - 1])
+    start = heel_strike[:-1]
+    finish = heel_strike[1:]
+
+    valid = np.ones(len(start), dtype=bool)
+    if 'TO' + side.upper() in events:
+        toe_off = np.sort(events['TO' + side.upper()].dropna().astype(int).unique())
+        valid &= np.searchsorted(toe_off, finish) - np.searchsorted(toe_off, start, side='right') == 1
+    if valid.any():
+        length = finish - start
+        median = np.median(length[valid])
+        valid &= (length <= max_ratio * median) & (length * max_ratio >= median)
+    return start[valid], finish[valid]
+
+
+def _normalize(values, start, finish, n_points):
+
+    # (cycles, n_points, columns) array of values linearly interpolated between start and finish frames
+    position = start[:, None] + (finish - start)[:, None] * np.linspace(0, 1, n_points)[None, :]
+    lower = np.floor(position).astype(int)
+    upper = np.minimum(lower + 1, len(values) - 1)
+    weight = (position - lower)[:, :, None]
+    return values[lower] * (1 - weight) + values[upper] * weight
+
+
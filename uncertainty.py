@@ -0,0 +1,124 @@
+# Oct 2026
+# A module for propagating marker and force plate uncertainty to joint angles, forces and moments
+
+import pandas as pd
+import numpy as np
+import inverse_kinematics as ik
+import inverse_dynamics as id
+
+
+def monte_carlo(marker_data, fp_data, body_mass, gender, n_samples=1000, marker_noise=(0.001, 0.0),
+                cop_noise=(0.0, 0.002), force_noise=(0.0, 0.0), percentiles=(2.5, 50, 97.5), chunk_size=100,
+                delta=0.01, seed=None):
+
+    """Returns per-frame percentile bands of joint angles, forces and moments under measurement noise
+
+    Methods
+    ==========
+    n_samples perturbed copies of marker_data and fp_data are run through segments, angles, center_of_mass,
+    derivative, force and moment at once, with the samples on the first axis of every array. Each noise model is a
+    (white, offset) pair of standard deviations: white noise is drawn independently for every frame, offset noise is
+    drawn once per sample and column and added to the whole trial (e.g. marker placement or force plate
+    calibration error). The trial is processed chunk_size frames at a time, keeping the last two perturbed frames of
+    each chunk as history for the derivative, so memory is about n_samples * chunk_size * 1.2 kB and the percentiles
+    are exact.
+
+    Parameters
+    ==========
+    marker_data : dataframe
+        A dataframe with 27 columns including 3d coordinates of 9 joints in m
+    fp_data : dataframe
+        A dataframe with 18 columns including 3d coordinates of center of pressure and 3d components of the force and
+        moment applied to the left and right force plates
+    body_mass : float
+        total body mass in kg
+    gender: bool
+        0 : male
+        1 : female
+    n_samples : int
+        number of Monte Carlo samples
+    marker_noise : tuple or dict
+        (white, offset) standard deviation of marker coordinates in m, or a dictionary of tuples per column
+    cop_noise : tuple or dict
+        (white, offset) standard deviation of the horizontal coordinates of the center of pressure (cop_*_x and
+        cop_*_z columns) in m, cop_*_y is on the plate surface and has no noise
+    force_noise : tuple or dict
+        (white, offset) standard deviation of the force plate forces (for_* columns) in N
+    percentiles : list
+        percentiles to report, between 0 and 100
+    chunk_size : int
+        number of frames processed at once
+    delta: float
+        delta_t in s
+    seed : int, optional
+        seed of the random generator
+
+    Returns
+    =======
+        A dictionary with three dataframes ('angles', 'force', 'moment') indexed by frame, with a
+        (column, p<percentile>) multi-index for columns
+    """
+
+    rng = np.random.default_rng(seed)
+    mass = id.mass(body_mass, gender)
+
+    markers = marker_data.to_numpy(dtype=float)
+    fp = fp_data.to_numpy(dtype=float)
+    marker_white, marker_offset = _noise(marker_data.columns, dict({'': marker_noise}))
+    cop = tuple('cop_' + side + '_' + axis for side in 'lr' for axis in 'xz')
+    fp_white, fp_offset = _noise(fp_data.columns, dict({cop: cop_noise, 'for_': force_noise}))
+
+    # offset noise is constant over the trial, so it is drawn once for all chunks
+    marker_offset = rng.normal(size=(n_samples, 1, len(marker_white))) * marker_offset
+    fp_offset = rng.normal(size=(n_samples, 1, len(fp_white))) * fp_offset
+
+    output = dict({'angles': [], 'force': [], 'moment': []})
+    columns = dict()
+    history = 0
+    for start in range(0, len(markers), chunk_size):
+        frames = slice(start, start + chunk_size)
+        marker_sample = markers[frames] + marker_offset + \
+            rng.normal(size=(n_samples, ) + markers[frames].shape) * marker_white
+        fp_sample = fp[frames] + fp_offset + rng.normal(size=(n_samples, ) + fp[frames].shape) * fp_white
+        if history:
+            marker_sample = np.concatenate([marker_history, marker_sample], axis=1)
+            fp_sample = np.concatenate([fp_history, fp_sample], axis=1)
+
+        marker = dict(zip(marker_data.columns, np.moveaxis(marker_sample, 2, 0)))
+        plate = dict(zip(fp_data.columns, np.moveaxis(fp_sample, 2, 0)))
+
+        angles = ik._angles(ik._segments(marker))
+        cm = id._center_of_mass(marker, gender)
+        cm_dd = id._derivative(cm, delta, 2)
+        force = id._force(plate, mass, cm_dd)
+        moment = id._moment(plate, marker, mass, cm, cm_dd, force)
+
+        for name, value in [('angles', angles), ('force', force), ('moment', moment)]:
+            columns[name] = list(value)
+            value = np.stack(list(value.values()), axis=2)[:, history:]
+            output[name].append(np.moveaxis(np.percentile(value, percentiles, axis=0), 0, 2))
+
+        marker_history = marker_sample[:, -2:]
+        fp_history = fp_sample[:, -2:]
+        history = marker_history.shape[1]
+
+    for name, value in output.items():
+        value = np.concatenate(value, axis=0)
+        value = value.reshape(len(value), -1)
+        output[name] = pd.DataFrame(value, columns=pd.MultiIndex.from_product(
+            [columns[name], ['p{}'.format(p) for p in percentiles]]))
+    return output
+
+
+def _noise(columns, models):
+
+    # white and offset standard deviation of each column; models maps a column prefix (or a tuple of prefixes) to a
+    # (white, offset) tuple or to a dictionary of tuples per column
+    white = np.zeros(len(columns))
+    offset = np.zeros(len(columns))
+    for i, col in enumerate(columns):
+        for prefix, model in models.items():
+            if col.startswith(prefix):
+                model = model.get(col, (0.0, 0.0)) if isinstance(model, dict) else model
+                white[i], offset[i] = model
+    return white, offset